@@ -1,5 +1,7 @@
+import math
 import os
 import sqlite3
+from pathlib import Path
 import pandas as pd
 import streamlit as st
 import plotly.express as px
@@ -60,6 +62,210 @@ h1, h2, h3 { font-family: 'Space Mono', monospace; }
 </style>
 """, unsafe_allow_html=True)
 
+# Layout shared by every Plotly figure
+CHART_LAYOUT = dict(
+    paper_bgcolor="#12151f", plot_bgcolor="#0d0f14",
+    legend=dict(bgcolor="#12151f", bordercolor="#252a3a"),
+    margin=dict(l=10, r=10, t=10, b=10),
+    hovermode="x unified",
+)
+
+# ── SQL Query Runner catalog ──────────────────────────────────────────────────
+QUERY_GROUPS = {
+    "📊 Cryptocurrencies (Metadata)": {
+        "1. Top 3 Cryptocurrencies by Market Cap": """SELECT name, market_cap
+FROM cryptocurrencies
+ORDER BY market_cap DESC
+LIMIT 3;""",
+        "2. Coins Where Circulating Supply > 90% of Total": """SELECT name, circulating_supply, total_supply
+FROM cryptocurrencies
+WHERE circulating_supply >= 0.9 * total_supply;""",
+        "3. Coins Within 10% of All-Time High (ATH)": """SELECT name, current_price, ath
+FROM cryptocurrencies
+WHERE current_price >= 0.9 * ath;""",
+        "4. Avg Market Cap Rank of Coins With Volume > $1B": """SELECT AVG(market_cap_rank) AS avg_rank
+FROM cryptocurrencies
+WHERE total_volume > 1000000000;""",
+        "5. Most Recently Updated Coin": """SELECT name, last_updated
+FROM cryptocurrencies
+ORDER BY last_updated DESC
+LIMIT 1;""",
+    },
+    "💰 Crypto Prices (Daily)": {
+        "6. Highest Bitcoin Price (Last 365 Days)": """SELECT MAX(price_usd) AS max_price
+FROM crypto_prices
+WHERE coin_id = 'bitcoin'
+AND date(date) >= DATE('now', '-365 day');""",
+        "7. Average Ethereum Price (Past 1 Year)": """SELECT ROUND(AVG(price_usd), 2) AS avg_price
+FROM crypto_prices
+WHERE coin_id = 'ethereum'
+AND date(date) >= DATE('now', '-365 day');""",
+        "8. Bitcoin Daily Price Trend in 2025": """SELECT date(date) AS date, price_usd
+FROM crypto_prices
+WHERE coin_id = 'bitcoin'
+AND date(date) BETWEEN '2025-01-01' AND '2025-12-31'
+ORDER BY date;""",
+        "9. Coin With Highest Average Price (All Time)": """SELECT coin_id, ROUND(AVG(price_usd), 2) AS avg_price
+FROM crypto_prices
+GROUP BY coin_id
+ORDER BY avg_price DESC
+LIMIT 1;""",
+        "10. Bitcoin % Price Change (Sep 2024 to Sep 2025)": """SELECT
+  ROUND((MAX(price_usd) - MIN(price_usd)) * 100.0 / MIN(price_usd), 2) AS pct_change
+FROM crypto_prices
+WHERE coin_id = 'bitcoin'
+AND date(date) BETWEEN '2024-09-01' AND '2025-09-30';""",
+    },
+    "🛢 Oil Prices": {
+        "11. Highest Oil Price (Last 5 Years)": """SELECT ROUND(MAX(price), 2) AS max_oil_price
+FROM oil_prices
+WHERE date(date) >= DATE('now', '-5 years');""",
+        "12. Average Oil Price Per Year": """SELECT strftime('%Y', date) AS year,
+       ROUND(AVG(price), 2) AS avg_price
+FROM oil_prices
+GROUP BY year
+ORDER BY year;""",
+        "13. Oil Prices During COVID Crash (Mar–Apr 2020)": """SELECT date(date) AS date, price
+FROM oil_prices
+WHERE date(date) BETWEEN '2020-03-01' AND '2020-04-30'
+ORDER BY date;""",
+        "14. Lowest Oil Price (All Time)": """SELECT ROUND(MIN(price), 2) AS min_oil_price
+FROM oil_prices;""",
+        "15. Oil Price Volatility Per Year (Max - Min)": """SELECT strftime('%Y', date) AS year,
+       ROUND(MAX(price) - MIN(price), 2) AS volatility
+FROM oil_prices
+GROUP BY year
+ORDER BY year;""",
+    },
+    "📈 Stock Prices": {
+        "16. All Stock Prices for S&P 500 (^GSPC)": """SELECT date(date) AS date, open, high, low, close, volume
+FROM stock_prices
+WHERE ticker = '^GSPC'
+ORDER BY date DESC
+LIMIT 100;""",
+        "17. Highest Closing Price for NASDAQ (^IXIC)": """SELECT ROUND(MAX(close), 2) AS max_close
+FROM stock_prices
+WHERE ticker = '^IXIC';""",
+        "18. Top 5 Days With Highest Price Spread for S&P 500": """SELECT date(date) AS date,
+       ROUND(high - low, 2) AS spread
+FROM stock_prices
+WHERE ticker = '^GSPC'
+ORDER BY spread DESC
+LIMIT 5;""",
+        "19. Monthly Average Closing Price Per Ticker": """SELECT ticker,
+       strftime('%Y-%m', date) AS month,
+       ROUND(AVG(close), 2) AS avg_close
+FROM stock_prices
+GROUP BY ticker, month
+ORDER BY ticker, month;""",
+        "20. Average Trading Volume of NSEI in 2024": """SELECT ROUND(AVG(volume), 0) AS avg_volume
+FROM stock_prices
+WHERE ticker = '^NSEI'
+AND strftime('%Y', date) = '2024';""",
+    },
+    "🔗 Cross-Market Join Queries": {
+        "21. Bitcoin vs Oil Average Price in 2025": """SELECT
+  ROUND(AVG(cp.price_usd), 2) AS avg_bitcoin,
+  ROUND(AVG(op.price), 2)     AS avg_oil
+FROM crypto_prices cp
+JOIN oil_prices op ON date(cp.date) = date(op.date)
+WHERE cp.coin_id = 'bitcoin'
+AND date(cp.date) BETWEEN '2025-01-01' AND '2025-12-31';""",
+        "22. Bitcoin vs S&P 500 (Correlation Check)": """SELECT date(cp.date) AS date,
+       cp.price_usd AS bitcoin_price,
+       sp.close     AS sp500_close
+FROM crypto_prices cp
+JOIN stock_prices sp ON date(cp.date) = date(sp.date)
+WHERE cp.coin_id = 'bitcoin'
+AND sp.ticker = '^GSPC'
+ORDER BY date DESC
+LIMIT 60;""",
+        "23. Ethereum vs NASDAQ Daily Prices in 2025": """SELECT date(cp.date) AS date,
+       cp.price_usd AS ethereum_price,
+       sp.close     AS nasdaq_close
+FROM crypto_prices cp
+JOIN stock_prices sp ON date(cp.date) = date(sp.date)
+WHERE cp.coin_id = 'ethereum'
+AND sp.ticker = '^IXIC'
+AND date(cp.date) BETWEEN '2025-01-01' AND '2025-12-31'
+ORDER BY date;""",
+        "24. Oil Price Spikes vs Bitcoin Price Change": """SELECT date(op.date) AS date,
+       op.price          AS oil_price,
+       cp.price_usd      AS bitcoin_price
+FROM oil_prices op
+JOIN crypto_prices cp ON date(op.date) = date(cp.date)
+WHERE cp.coin_id = 'bitcoin'
+ORDER BY op.price DESC
+LIMIT 20;""",
+        "25. Top 3 Crypto Coins vs NIFTY (^NSEI) 2025": """SELECT date(cp.date) AS date,
+       cp.coin_id,
+       cp.price_usd AS crypto_price,
+       sp.close     AS nifty_close
+FROM crypto_prices cp
+JOIN stock_prices sp ON date(cp.date) = date(sp.date)
+WHERE sp.ticker = '^NSEI'
+AND date(cp.date) BETWEEN '2025-01-01' AND '2025-12-31'
+AND cp.coin_id IN (
+    SELECT coin_id FROM crypto_prices
+    GROUP BY coin_id ORDER BY AVG(price_usd) DESC LIMIT 3
+)
+ORDER BY date, cp.coin_id;""",
+        "26. S&P 500 vs Crude Oil on Same Dates": """SELECT date(sp.date) AS date,
+       sp.close  AS sp500_close,
+       op.price  AS oil_price
+FROM stock_prices sp
+JOIN oil_prices op ON date(sp.date) = date(op.date)
+WHERE sp.ticker = '^GSPC'
+ORDER BY date DESC
+LIMIT 60;""",
+        "27. Bitcoin vs Crude Oil (Same Date Correlation)": """SELECT date(cp.date) AS date,
+       cp.price_usd AS bitcoin_price,
+       op.price     AS oil_price
+FROM crypto_prices cp
+JOIN oil_prices op ON date(cp.date) = date(op.date)
+WHERE cp.coin_id = 'bitcoin'
+ORDER BY date DESC
+LIMIT 60;""",
+        "28. NASDAQ vs Ethereum Price Trends": """SELECT date(sp.date) AS date,
+       sp.close     AS nasdaq_close,
+       cp.price_usd AS ethereum_price
+FROM stock_prices sp
+JOIN crypto_prices cp ON date(sp.date) = date(cp.date)
+WHERE sp.ticker = '^IXIC'
+AND cp.coin_id = 'ethereum'
+ORDER BY date DESC
+LIMIT 60;""",
+        "29. Top 3 Crypto Coins Joined with Stock Indices (2025)": """SELECT date(cp.date) AS date,
+       cp.coin_id,
+       cp.price_usd AS crypto_price,
+       sp.ticker,
+       sp.close     AS stock_close
+FROM crypto_prices cp
+JOIN stock_prices sp ON date(cp.date) = date(sp.date)
+WHERE date(cp.date) BETWEEN '2025-01-01' AND '2025-12-31'
+AND cp.coin_id IN (
+    SELECT coin_id FROM crypto_prices
+    GROUP BY coin_id ORDER BY AVG(price_usd) DESC LIMIT 3
+)
+AND sp.ticker IN ('^GSPC', '^NSEI', '^IXIC')
+ORDER BY date, cp.coin_id, sp.ticker;""",
+        "30. Multi-Join: Stocks + Oil + Bitcoin (Daily)": """SELECT date(cp.date) AS date,
+       cp.price_usd AS bitcoin_price,
+       op.price     AS oil_price,
+       sp.close     AS sp500_close
+FROM crypto_prices cp
+JOIN oil_prices op   ON date(cp.date) = date(op.date)
+JOIN stock_prices sp ON date(cp.date) = date(sp.date)
+WHERE cp.coin_id = 'bitcoin'
+AND sp.ticker = '^GSPC'
+ORDER BY date DESC
+LIMIT 60;""",
+    },
+}
+
+# Flat name -> SQL lookup, built once at import rather than on every rerun
+PREDEFINED = {name: sql for group in QUERY_GROUPS.values() for name, sql in group.items()}
+
 # ── DB helpers ────────────────────────────────────────────────────────────────
 def find_db():
     """Search for the database file in common locations relative to this script."""
@@ -79,6 +285,41 @@ def find_db():
 
 DB_PATH = find_db()
 
+# Expression indexes matching the `date(date)` predicates in the SQL Query Runner catalog
+INDEXES = {
+    "idx_cp_coin_date":   "CREATE INDEX IF NOT EXISTS idx_cp_coin_date ON crypto_prices(coin_id, date(date))",
+    "idx_sp_ticker_date": "CREATE INDEX IF NOT EXISTS idx_sp_ticker_date ON stock_prices(ticker, date(date))",
+    "idx_op_date":        "CREATE INDEX IF NOT EXISTS idx_op_date ON oil_prices(date(date))",
+}
+
+# Read-heavy tuning applied to the shared read-only connection
+PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",      # 64 MB page cache
+    "PRAGMA mmap_size=268435456",    # 256 MB memory-mapped I/O
+)
+
+@st.cache_resource(show_spinner=False)
+def ensure_indexes(db_mtime: float):
+    """Create any missing indexes and planner stats once per database file version.
+    The shipped DB already has them, so on a clean checkout this only reads the schema."""
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            existing = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+            missing = [ddl for name, ddl in INDEXES.items() if name not in existing]
+            # Only write when something is missing so the file (and its mtime) stays put
+            if missing:
+                for ddl in missing:
+                    conn.execute(ddl)
+                conn.execute("ANALYZE")
+                conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        pass  # read-only copy of the DB: queries still work, just without the indexes
+
 def get_conn():
     if not os.path.exists(DB_PATH):
         st.error(f"""
@@ -93,12 +334,22 @@ Could not find `mydb (4).db`. Please make sure **app.py and the database file ar
 **How to fix:** Copy `mydb (4).db` into the same folder as `app.py` and restart.
         """)
         st.stop()
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
-
-@st.cache_data(show_spinner=False)
+    ensure_indexes(os.path.getmtime(DB_PATH))
+    return open_conn()
+
+@st.cache_resource(show_spinner=False)
+def open_conn():
+    """Open one tuned, read-only connection per server process instead of one per query."""
+    conn = sqlite3.connect(f"{Path(DB_PATH).as_uri()}?mode=ro", uri=True, check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+@st.cache_resource(show_spinner=False)
 def run_query(sql: str, params=()):
-    with get_conn() as conn:
-        return pd.read_sql_query(sql, conn, params=params)
+    """Cached by SQL + params. The returned DataFrame is shared across reruns and sessions,
+    so callers must not modify it in place — derive new frames (`.assign`, `.copy`) instead."""
+    return pd.read_sql_query(sql, get_conn(), params=params)
 
 @st.cache_data(show_spinner=False)
 def get_bitcoin_coin_id():
@@ -121,22 +372,111 @@ def get_bitcoin_coin_id():
 def get_db_date_range():
     """Get the actual date range available across all tables."""
     ranges = []
-    for table, col in [("crypto_prices","date"), ("oil_prices","date"), ("stock_prices","date")]:
-        try:
-            df = run_query(f"SELECT MIN(date({col})) as mn, MAX(date({col})) as mx FROM {table}")
-            if not df.empty and df["mn"].iloc[0]:
+    try:
+        # One round-trip for all three tables
+        df = run_query("""
+            SELECT 'crypto' AS src, MIN(date(date)) AS mn, MAX(date(date)) AS mx FROM crypto_prices
+            UNION ALL
+            SELECT 'oil',           MIN(date(date)),       MAX(date(date))       FROM oil_prices
+            UNION ALL
+            SELECT 'stock',         MIN(date(date)),       MAX(date(date))       FROM stock_prices
+        """)
+        for mn, mx in zip(df["mn"], df["mx"]):
+            if mn:
                 ranges.append((
-                    pd.to_datetime(df["mn"].iloc[0], format='mixed', dayfirst=False).date(),
-                    pd.to_datetime(df["mx"].iloc[0], format='mixed', dayfirst=False).date(),
+                    pd.to_datetime(mn, format="%Y-%m-%d").date(),
+                    pd.to_datetime(mx, format="%Y-%m-%d").date(),
                 ))
-        except:
-            pass
+    except:
+        pass
     if not ranges:
         return date(2022, 1, 1), date.today()
     all_mins = [r[0] for r in ranges]
     all_maxs = [r[1] for r in ranges]
     return min(all_mins), max(all_maxs)
 
+@st.cache_resource(show_spinner=False)
+def load_all_prices():
+    """Read the three price tables once per process; pages filter these frames in pandas
+    instead of re-querying SQLite on every interaction (the SQL Query Runner still uses
+    run_query). Shared across sessions — don't modify in place."""
+    conn = get_conn()
+    frames = {
+        "crypto": pd.read_sql_query("SELECT coin_id, date(date) AS date, price_usd FROM crypto_prices", conn),
+        "oil":    pd.read_sql_query("SELECT date(date) AS date, price AS price FROM oil_prices", conn),
+        "stock":  pd.read_sql_query("SELECT ticker AS ticker, date(date) AS date, close AS close FROM stock_prices", conn),
+    }
+    for df in frames.values():
+        df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d", cache=True)
+    frames["crypto"]["coin_id"] = frames["crypto"]["coin_id"].astype("category")
+    frames["stock"]["ticker"] = frames["stock"]["ticker"].astype("category")
+    return frames
+
+# Per-range Market Overview caches are shared across sessions; cap how many date ranges they hold
+MARKET_CACHE_ENTRIES = 16
+
+@st.cache_resource(show_spinner=False, ttl=3600, max_entries=MARKET_CACHE_ENTRIES)
+def get_market_series(sd: str, ed: str, btc_id: str):
+    """(date, value) frames for Bitcoin, oil, S&P 500 and NIFTY within [sd, ed].
+    Cached so the averages and the merged frame filter the full tables only once per range."""
+    prices = load_all_prices()
+    lo, hi = pd.Timestamp(sd), pd.Timestamp(ed)
+
+    def pick(df, mask, col, name):
+        in_range = df["date"].between(lo, hi)
+        if mask is not None:
+            in_range &= mask
+        return df.loc[in_range, ["date", col]].rename(columns={col: name})
+
+    crypto, oil, stock = prices["crypto"], prices["oil"], prices["stock"]
+    return (
+        pick(crypto, crypto["coin_id"] == btc_id, "price_usd", "bitcoin_price"),
+        pick(oil, None, "price", "oil_price"),
+        pick(stock, stock["ticker"] == "^GSPC", "close", "sp500_close"),
+        pick(stock, stock["ticker"] == "^NSEI", "close", "nifty_close"),
+    )
+
+@st.cache_resource(show_spinner=False, ttl=3600, max_entries=MARKET_CACHE_ENTRIES)
+def get_market_averages(sd: str, ed: str, btc_id: str):
+    """Average price per market and the latest date with any data."""
+    series = get_market_series(sd, ed, btc_id)
+    avgs = dict(zip(["btc_avg", "oil_avg", "sp_avg", "ni_avg"], (s.iloc[:, 1].mean() for s in series)))
+    dates = pd.concat([s.loc[s.iloc[:, 1].notna(), "date"] for s in series])
+    avgs["latest_date"] = dates.max().strftime("%Y-%m-%d") if not dates.empty else None
+    return avgs
+
+@st.cache_resource(show_spinner=False, ttl=3600, max_entries=MARKET_CACHE_ENTRIES)
+def get_market_data(sd: str, ed: str, btc_id: str):
+    """Daily Bitcoin / oil / S&P 500 / NIFTY rows for the range (dates with no data dropped).
+    Shared across reruns like run_query — don't modify in place."""
+    btc, oil, sp, ni = get_market_series(sd, ed, btc_id)
+    # Outer merges keep every date any market traded
+    df = btc.merge(oil, on="date", how="outer").merge(sp, on="date", how="outer").merge(ni, on="date", how="outer")
+    df = df[~(df[["bitcoin_price","oil_price","sp500_close","nifty_close"]].isnull().all(axis=1))]
+    return df.sort_values("date", ascending=False, kind="stable").reset_index(drop=True)
+
+@st.cache_resource(show_spinner=False, ttl=3600, max_entries=MARKET_CACHE_ENTRIES)
+def build_market_frame(sd: str, ed: str, btc_id: str):
+    """Long-form (date, Market, Value) frame normalized to base 100, ready for px.line."""
+    df = get_market_data(sd, ed, btc_id)
+    # float32 is plenty for a base-100 chart and halves what Plotly serializes
+    plot_df = df.sort_values("date").set_index("date")[
+        ["bitcoin_price","oil_price","sp500_close","nifty_close"]
+    ].astype("float32")
+
+    # First non-null value per column as its base, applied in one broadcast
+    bases = plot_df.bfill().iloc[0]
+    plot_df = plot_df.div(bases).mul(100)
+
+    norm = plot_df.reset_index().melt(id_vars="date", var_name="Market", value_name="Value")
+    norm["Market"] = norm["Market"].map({
+        "bitcoin_price": "Bitcoin",
+        "oil_price": "Crude Oil",
+        "sp500_close": "S&P 500",
+        "nifty_close": "NIFTY 50",
+    }).astype("category")
+    return norm
+
 # ── Sidebar ───────────────────────────────────────────────────────────────────
 with st.sidebar:
     st.markdown("## 📊 Cross-Market")
@@ -178,45 +518,10 @@ if page == "🌐 Market Overview":
         st.stop()
 
     
-    sql = """
-        WITH all_dates AS (
-            SELECT DISTINCT date(date) AS date FROM crypto_prices  WHERE date(date) BETWEEN :sd AND :ed
-            UNION
-            SELECT DISTINCT date(date) AS date FROM oil_prices     WHERE date(date) BETWEEN :sd AND :ed
-            UNION
-            SELECT DISTINCT date(date) AS date FROM stock_prices   WHERE date(date) BETWEEN :sd AND :ed
-        )
-        SELECT
-            d.date,
-            cp.price_usd  AS bitcoin_price,
-            o.price       AS oil_price,
-            sp.close      AS sp500_close,
-            ni.close      AS nifty_close
-        FROM all_dates d
-        LEFT JOIN (
-            SELECT date(date) AS date, price_usd FROM crypto_prices WHERE coin_id = :btc
-        ) cp ON d.date = cp.date
-        LEFT JOIN (
-            SELECT date(date) AS date, price FROM oil_prices
-        ) o ON d.date = o.date
-        LEFT JOIN (
-            SELECT date(date) AS date, close FROM stock_prices WHERE ticker = '^GSPC'
-        ) sp ON d.date = sp.date
-        LEFT JOIN (
-            SELECT date(date) AS date, close FROM stock_prices WHERE ticker = '^NSEI'
-        ) ni ON d.date = ni.date
-        ORDER BY d.date DESC
-    """
-
-    with st.spinner("Loading market data…"):
-        with get_conn() as conn:
-            df = pd.read_sql_query(sql, conn, params={"sd": sd, "ed": ed, "btc": btc_id})
+    # Metric cards come from the same in-memory price frames as the chart and snapshot
+    avgs = get_market_averages(sd, ed, btc_id)
 
-    
-    df = df[~(df[["bitcoin_price","oil_price","sp500_close","nifty_close"]].isnull().all(axis=1))].copy()
-    df["date"] = pd.to_datetime(df["date"], format='mixed', dayfirst=False).dt.normalize()
-
-    if df.empty:
+    if avgs["latest_date"] is None:
         st.warning("No data found for the selected date range. Try widening the range.")
         with st.expander("🔍 Debug info"):
             st.write("**Bitcoin coin_id detected:**", btc_id)
@@ -226,13 +531,12 @@ if page == "🌐 Market Overview":
             st.write("**Stock tickers:**", run_query("SELECT DISTINCT ticker FROM stock_prices"))
         st.stop()
 
-   
-    btc_avg = df["bitcoin_price"].mean()
-    oil_avg = df["oil_price"].mean()
-    sp_avg  = df["sp500_close"].mean()
-    ni_avg  = df["nifty_close"].mean()
+    btc_avg = avgs["btc_avg"]
+    oil_avg = avgs["oil_avg"]
+    sp_avg  = avgs["sp_avg"]
+    ni_avg  = avgs["ni_avg"]
 
-    latest_date = df["date"].max().strftime("%Y-%m-%d")
+    latest_date = avgs["latest_date"]
     st.markdown(f'<p style="color:#4f6ef7;font-size:0.8rem;margin:0.5rem 0;">{latest_date}</p>', unsafe_allow_html=True)
 
   
@@ -272,26 +576,13 @@ if page == "🌐 Market Overview":
 
     st.markdown("---")
 
+    with st.spinner("Preparing chart data…"):
+        df = get_market_data(sd, ed, btc_id)
+        norm = build_market_frame(sd, ed, btc_id)
+
     
     st.markdown('<div class="section-header">Normalized Price Trends (Base = 100)</div>', unsafe_allow_html=True)
 
-    plot_df = df.sort_values("date").set_index("date")[
-        ["bitcoin_price","oil_price","sp500_close","nifty_close"]
-    ].copy()
-
-    for c in plot_df.columns:
-        first = plot_df[c].dropna()
-        if not first.empty:
-            plot_df[c] = plot_df[c] / first.iloc[0] * 100
-
-    norm = plot_df.reset_index().melt(id_vars="date", var_name="Market", value_name="Value")
-    norm["Market"] = norm["Market"].map({
-        "bitcoin_price": "Bitcoin",
-        "oil_price": "Crude Oil",
-        "sp500_close": "S&P 500",
-        "nifty_close": "NIFTY 50",
-    })
-
     fig = px.line(
         norm.dropna(), x="date", y="Value", color="Market",
         color_discrete_map={
@@ -302,41 +593,36 @@ if page == "🌐 Market Overview":
         },
         template="plotly_dark",
     )
-    fig.update_layout(
-        paper_bgcolor="#12151f", plot_bgcolor="#0d0f14",
-        legend=dict(bgcolor="#12151f", bordercolor="#252a3a"),
-        margin=dict(l=10, r=10, t=10, b=10),
-        hovermode="x unified",
-        yaxis_title="Normalized Value (Base=100)",
-    )
+    fig.update_layout(**CHART_LAYOUT, yaxis_title="Normalized Value (Base=100)")
     st.plotly_chart(fig, use_container_width=True)
 
     
     st.markdown('<div class="section-header">📋 Daily Market Snapshot</div>', unsafe_allow_html=True)
 
-    snap = df.copy()
-    snap["date"] = snap["date"].dt.strftime("%Y-%m-%d")
-    snap = snap.rename(columns={
+    # Only ship one page of rows to the browser; wide ranges run to thousands of days
+    page_size = 500
+    offset = 0
+    if len(df) > page_size:
+        n_pages = math.ceil(len(df) / page_size)
+        page_no = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1)
+        offset = (page_no - 1) * page_size
+        st.caption(f"Rows {offset + 1:,}–{min(offset + page_size, len(df)):,} of {len(df):,}")
+
+    page_df = df.iloc[offset:offset + page_size]
+    snap = page_df.assign(date=page_df["date"].dt.strftime("%Y-%m-%d")).rename(columns={
         "bitcoin_price": "bitcoin_price",
         "oil_price":     "oil_price",
         "sp500_close":   "sp500",
         "nifty_close":   "nifty",
     })
 
-    def safe_fmt(x, decimals=4):
-        try:
-            if pd.isna(x): return "—"
-            return f"{x:,.{decimals}f}"
-        except:
-            return str(x)
-
     st.dataframe(
         snap.style.format({
-            "bitcoin_price": lambda x: safe_fmt(x, 4),
-            "oil_price":     lambda x: safe_fmt(x, 2),
-            "sp500":         lambda x: safe_fmt(x, 4),
-            "nifty":         lambda x: safe_fmt(x, 4),
-        }),
+            "bitcoin_price": "{:,.4f}",
+            "oil_price":     "{:,.2f}",
+            "sp500":         "{:,.4f}",
+            "nifty":         "{:,.4f}",
+        }, na_rep="—"),
         use_container_width=True,
         height=420,
     )
@@ -347,217 +633,29 @@ if page == "🌐 Market Overview":
 elif page == "🛠 SQL Query Runner":
     st.title("🛠 SQL Query Runner")
 
-    
-    QUERY_GROUPS = {
-        "📊 Cryptocurrencies (Metadata)": {
-            "1. Top 3 Cryptocurrencies by Market Cap": """SELECT name, market_cap
-FROM cryptocurrencies
-ORDER BY market_cap DESC
-LIMIT 3;""",
-            "2. Coins Where Circulating Supply > 90% of Total": """SELECT name, circulating_supply, total_supply
-FROM cryptocurrencies
-WHERE circulating_supply >= 0.9 * total_supply;""",
-            "3. Coins Within 10% of All-Time High (ATH)": """SELECT name, current_price, ath
-FROM cryptocurrencies
-WHERE current_price >= 0.9 * ath;""",
-            "4. Avg Market Cap Rank of Coins With Volume > $1B": """SELECT AVG(market_cap_rank) AS avg_rank
-FROM cryptocurrencies
-WHERE total_volume > 1000000000;""",
-            "5. Most Recently Updated Coin": """SELECT name, last_updated
-FROM cryptocurrencies
-ORDER BY last_updated DESC
-LIMIT 1;""",
-        },
-        "💰 Crypto Prices (Daily)": {
-            "6. Highest Bitcoin Price (Last 365 Days)": """SELECT MAX(price_usd) AS max_price
-FROM crypto_prices
-WHERE coin_id = 'bitcoin'
-AND date(date) >= DATE('now', '-365 day');""",
-            "7. Average Ethereum Price (Past 1 Year)": """SELECT ROUND(AVG(price_usd), 2) AS avg_price
-FROM crypto_prices
-WHERE coin_id = 'ethereum'
-AND date(date) >= DATE('now', '-365 day');""",
-            "8. Bitcoin Daily Price Trend in 2025": """SELECT date(date) AS date, price_usd
-FROM crypto_prices
-WHERE coin_id = 'bitcoin'
-AND date(date) BETWEEN '2025-01-01' AND '2025-12-31'
-ORDER BY date;""",
-            "9. Coin With Highest Average Price (All Time)": """SELECT coin_id, ROUND(AVG(price_usd), 2) AS avg_price
-FROM crypto_prices
-GROUP BY coin_id
-ORDER BY avg_price DESC
-LIMIT 1;""",
-            "10. Bitcoin % Price Change (Sep 2024 to Sep 2025)": """SELECT
-  ROUND((MAX(price_usd) - MIN(price_usd)) * 100.0 / MIN(price_usd), 2) AS pct_change
-FROM crypto_prices
-WHERE coin_id = 'bitcoin'
-AND date(date) BETWEEN '2024-09-01' AND '2025-09-30';""",
-        },
-        "🛢 Oil Prices": {
-            "11. Highest Oil Price (Last 5 Years)": """SELECT ROUND(MAX(price), 2) AS max_oil_price
-FROM oil_prices
-WHERE date(date) >= DATE('now', '-5 years');""",
-            "12. Average Oil Price Per Year": """SELECT strftime('%Y', date) AS year,
-       ROUND(AVG(price), 2) AS avg_price
-FROM oil_prices
-GROUP BY year
-ORDER BY year;""",
-            "13. Oil Prices During COVID Crash (Mar–Apr 2020)": """SELECT date(date) AS date, price
-FROM oil_prices
-WHERE date(date) BETWEEN '2020-03-01' AND '2020-04-30'
-ORDER BY date;""",
-            "14. Lowest Oil Price (All Time)": """SELECT ROUND(MIN(price), 2) AS min_oil_price
-FROM oil_prices;""",
-            "15. Oil Price Volatility Per Year (Max - Min)": """SELECT strftime('%Y', date) AS year,
-       ROUND(MAX(price) - MIN(price), 2) AS volatility
-FROM oil_prices
-GROUP BY year
-ORDER BY year;""",
-        },
-        "📈 Stock Prices": {
-            "16. All Stock Prices for S&P 500 (^GSPC)": """SELECT date(date) AS date, open, high, low, close, volume
-FROM stock_prices
-WHERE ticker = '^GSPC'
-ORDER BY date DESC
-LIMIT 100;""",
-            "17. Highest Closing Price for NASDAQ (^IXIC)": """SELECT ROUND(MAX(close), 2) AS max_close
-FROM stock_prices
-WHERE ticker = '^IXIC';""",
-            "18. Top 5 Days With Highest Price Spread for S&P 500": """SELECT date(date) AS date,
-       ROUND(high - low, 2) AS spread
-FROM stock_prices
-WHERE ticker = '^GSPC'
-ORDER BY spread DESC
-LIMIT 5;""",
-            "19. Monthly Average Closing Price Per Ticker": """SELECT ticker,
-       strftime('%Y-%m', date) AS month,
-       ROUND(AVG(close), 2) AS avg_close
-FROM stock_prices
-GROUP BY ticker, month
-ORDER BY ticker, month;""",
-            "20. Average Trading Volume of NSEI in 2024": """SELECT ROUND(AVG(volume), 0) AS avg_volume
-FROM stock_prices
-WHERE ticker = '^NSEI'
-AND strftime('%Y', date) = '2024';""",
-        },
-        "🔗 Cross-Market Join Queries": {
-            "21. Bitcoin vs Oil Average Price in 2025": """SELECT
-  ROUND(AVG(cp.price_usd), 2) AS avg_bitcoin,
-  ROUND(AVG(op.price), 2)     AS avg_oil
-FROM crypto_prices cp
-JOIN oil_prices op ON date(cp.date) = date(op.date)
-WHERE cp.coin_id = 'bitcoin'
-AND date(cp.date) BETWEEN '2025-01-01' AND '2025-12-31';""",
-            "22. Bitcoin vs S&P 500 (Correlation Check)": """SELECT date(cp.date) AS date,
-       cp.price_usd AS bitcoin_price,
-       sp.close     AS sp500_close
-FROM crypto_prices cp
-JOIN stock_prices sp ON date(cp.date) = date(sp.date)
-WHERE cp.coin_id = 'bitcoin'
-AND sp.ticker = '^GSPC'
-ORDER BY date DESC
-LIMIT 60;""",
-            "23. Ethereum vs NASDAQ Daily Prices in 2025": """SELECT date(cp.date) AS date,
-       cp.price_usd AS ethereum_price,
-       sp.close     AS nasdaq_close
-FROM crypto_prices cp
-JOIN stock_prices sp ON date(cp.date) = date(sp.date)
-WHERE cp.coin_id = 'ethereum'
-AND sp.ticker = '^IXIC'
-AND date(cp.date) BETWEEN '2025-01-01' AND '2025-12-31'
-ORDER BY date;""",
-            "24. Oil Price Spikes vs Bitcoin Price Change": """SELECT date(op.date) AS date,
-       op.price          AS oil_price,
-       cp.price_usd      AS bitcoin_price
-FROM oil_prices op
-JOIN crypto_prices cp ON date(op.date) = date(cp.date)
-WHERE cp.coin_id = 'bitcoin'
-ORDER BY op.price DESC
-LIMIT 20;""",
-            "25. Top 3 Crypto Coins vs NIFTY (^NSEI) 2025": """SELECT date(cp.date) AS date,
-       cp.coin_id,
-       cp.price_usd AS crypto_price,
-       sp.close     AS nifty_close
-FROM crypto_prices cp
-JOIN stock_prices sp ON date(cp.date) = date(sp.date)
-WHERE sp.ticker = '^NSEI'
-AND date(cp.date) BETWEEN '2025-01-01' AND '2025-12-31'
-AND cp.coin_id IN (
-    SELECT coin_id FROM crypto_prices
-    GROUP BY coin_id ORDER BY AVG(price_usd) DESC LIMIT 3
-)
-ORDER BY date, cp.coin_id;""",
-            "26. S&P 500 vs Crude Oil on Same Dates": """SELECT date(sp.date) AS date,
-       sp.close  AS sp500_close,
-       op.price  AS oil_price
-FROM stock_prices sp
-JOIN oil_prices op ON date(sp.date) = date(op.date)
-WHERE sp.ticker = '^GSPC'
-ORDER BY date DESC
-LIMIT 60;""",
-            "27. Bitcoin vs Crude Oil (Same Date Correlation)": """SELECT date(cp.date) AS date,
-       cp.price_usd AS bitcoin_price,
-       op.price     AS oil_price
-FROM crypto_prices cp
-JOIN oil_prices op ON date(cp.date) = date(op.date)
-WHERE cp.coin_id = 'bitcoin'
-ORDER BY date DESC
-LIMIT 60;""",
-            "28. NASDAQ vs Ethereum Price Trends": """SELECT date(sp.date) AS date,
-       sp.close     AS nasdaq_close,
-       cp.price_usd AS ethereum_price
-FROM stock_prices sp
-JOIN crypto_prices cp ON date(sp.date) = date(cp.date)
-WHERE sp.ticker = '^IXIC'
-AND cp.coin_id = 'ethereum'
-ORDER BY date DESC
-LIMIT 60;""",
-            "29. Top 3 Crypto Coins Joined with Stock Indices (2025)": """SELECT date(cp.date) AS date,
-       cp.coin_id,
-       cp.price_usd AS crypto_price,
-       sp.ticker,
-       sp.close     AS stock_close
-FROM crypto_prices cp
-JOIN stock_prices sp ON date(cp.date) = date(sp.date)
-WHERE date(cp.date) BETWEEN '2025-01-01' AND '2025-12-31'
-AND cp.coin_id IN (
-    SELECT coin_id FROM crypto_prices
-    GROUP BY coin_id ORDER BY AVG(price_usd) DESC LIMIT 3
-)
-AND sp.ticker IN ('^GSPC', '^NSEI', '^IXIC')
-ORDER BY date, cp.coin_id, sp.ticker;""",
-            "30. Multi-Join: Stocks + Oil + Bitcoin (Daily)": """SELECT date(cp.date) AS date,
-       cp.price_usd AS bitcoin_price,
-       op.price     AS oil_price,
-       sp.close     AS sp500_close
-FROM crypto_prices cp
-JOIN oil_prices op   ON date(cp.date) = date(op.date)
-JOIN stock_prices sp ON date(cp.date) = date(sp.date)
-WHERE cp.coin_id = 'bitcoin'
-AND sp.ticker = '^GSPC'
-ORDER BY date DESC
-LIMIT 60;""",
-        },
-    }
-
-    
-    PREDEFINED = {}
-    for group_queries in QUERY_GROUPS.values():
-        PREDEFINED.update(group_queries)
-
     st.markdown('<div class="section-header">Select a Query</div>', unsafe_allow_html=True)
 
+    def clear_last_run():
+        st.session_state.pop("sql_last_run", None)
+
     cat_col, q_col = st.columns([1, 2])
     with cat_col:
-        category = st.selectbox("Category", list(QUERY_GROUPS.keys()), label_visibility="visible")
+        category = st.selectbox("Category", list(QUERY_GROUPS.keys()), label_visibility="visible",
+                                on_change=clear_last_run)
     with q_col:
         query_names = list(QUERY_GROUPS[category].keys())
-        selected_name = st.selectbox("Query", query_names, label_visibility="visible")
+        selected_name = st.selectbox("Query", query_names, label_visibility="visible",
+                                     on_change=clear_last_run)
 
     selected = PREDEFINED[selected_name]
     st.code(selected.strip(), language="sql")
 
     if st.button("▶  Run Query", use_container_width=True):
+        st.session_state["sql_last_run"] = selected_name
+
+    # Keep showing the last run across reruns (e.g. the chart toggle); picking another query or
+    # category clears it. run_query is cached, so this doesn't re-execute the SQL
+    if st.session_state.get("sql_last_run") == selected_name:
         try:
             with st.spinner("Executing…"):
                 result = run_query(selected)
@@ -565,7 +663,8 @@ LIMIT 60;""",
             st.dataframe(result, use_container_width=True)
 
             num_cols = result.select_dtypes(include="number").columns.tolist()
-            if len(result) > 1 and num_cols:
+            # Plotly figures are only built on request, and never for single rows / non-numeric results
+            if len(result) > 1 and num_cols and st.toggle("📈 Show chart"):
                 x_col = result.columns[0]
                 # Use line chart if first column looks like a date/time series
                 is_timeseries = (
@@ -593,12 +692,7 @@ LIMIT 60;""",
                         template="plotly_dark",
                         color_discrete_sequence=["#4f6ef7","#f7931a","#4fd1c5","#e879f9","#facc15"],
                     )
-                fig2.update_layout(
-                    paper_bgcolor="#12151f", plot_bgcolor="#0d0f14",
-                    margin=dict(l=10, r=10, t=10, b=10),
-                    hovermode="x unified",
-                    legend=dict(bgcolor="#12151f", bordercolor="#252a3a"),
-                )
+                fig2.update_layout(**CHART_LAYOUT)
                 st.plotly_chart(fig2, use_container_width=True)
         except Exception as e:
             st.error(f"Query error: {e}")
@@ -611,50 +705,42 @@ elif page == "🪙 Top 3 Crypto Analysis":
 
     @st.cache_data(show_spinner=False)
     def get_top3():
-        
-        df = run_query("""
-            SELECT coin_id, price_usd
-            FROM crypto_prices
-            WHERE date(date) = (
-                SELECT MAX(date(date)) FROM crypto_prices AS cp2
-                WHERE cp2.coin_id = crypto_prices.coin_id
-            )
-            GROUP BY coin_id
-            ORDER BY price_usd DESC
-            LIMIT 3
-        """)
-        if len(df) < 3:
-            
-            df = run_query("""
-                SELECT coin_id, AVG(price_usd) AS avg_p
+        """Top 3 coins with their name/symbol joined in, so labels need no second query."""
+        # Latest row per coin in one ordered pass instead of a correlated MAX per row
+        latest = """
+            SELECT coin_id, price_usd AS rank_p
+            FROM (
+                SELECT coin_id, price_usd,
+                       ROW_NUMBER() OVER (PARTITION BY coin_id ORDER BY date(date) DESC) AS rn
                 FROM crypto_prices
-                GROUP BY coin_id
-                ORDER BY avg_p DESC
+            )
+            WHERE rn = 1
+        """
+        # Fallback: highest average price
+        average = "SELECT coin_id, AVG(price_usd) AS rank_p FROM crypto_prices GROUP BY coin_id"
+        for ranked in (latest, average):
+            df = run_query(f"""
+                SELECT t.coin_id, c.name, c.symbol
+                FROM ({ranked}) t
+                LEFT JOIN cryptocurrencies c ON LOWER(c.id) = LOWER(t.coin_id)
+                ORDER BY t.rank_p DESC
                 LIMIT 3
             """)
-        return df["coin_id"].tolist() if not df.empty else []
+            if len(df) >= 3:
+                break
+        return df
 
     top3 = get_top3()
-    if not top3:
+    if top3.empty:
         st.warning("No cryptocurrency data found.")
         st.stop()
 
-    
-    @st.cache_data(show_spinner=False)
-    def get_coin_display_names(coin_ids):
-        placeholders = ",".join(["?" for _ in coin_ids])
-        df = run_query(
-            f"SELECT id, name, symbol FROM cryptocurrencies WHERE LOWER(id) IN ({placeholders})",
-            tuple(c.lower() for c in coin_ids)
-        )
-        mapping = {}
-        for _, row in df.iterrows():
-            mapping[row["id"]] = f"{row['name']} ({row['symbol'].upper()})"
-        return mapping
-
-    name_map = get_coin_display_names(tuple(top3))
-    display_labels = [name_map.get(c, c.title()) for c in top3]
-    label_to_id = dict(zip(display_labels, top3))
+    display_labels = (
+        (top3["name"] + " (" + top3["symbol"].str.upper() + ")")
+        .fillna(top3["coin_id"].str.title())
+        .tolist()
+    )
+    label_to_id = dict(zip(display_labels, top3["coin_id"]))
 
     db_min, db_max = get_db_date_range()
 
@@ -672,16 +758,19 @@ elif page == "🪙 Top 3 Crypto Analysis":
         st.error("Invalid date range.")
         st.stop()
 
-    cdf = run_query(
-        "SELECT date(date) AS date, price_usd FROM crypto_prices WHERE coin_id=? AND date(date) BETWEEN ? AND ? ORDER BY date(date)",
-        (coin, str(start_c), str(end_c))
+    crypto = load_all_prices()["crypto"]
+    cdf = (
+        crypto.loc[
+            (crypto["coin_id"] == coin) & crypto["date"].between(pd.Timestamp(start_c), pd.Timestamp(end_c)),
+            ["date", "price_usd"],
+        ]
+        .sort_values("date", kind="stable")
+        .reset_index(drop=True)
     )
     if cdf.empty:
         st.warning("No data for selected coin and date range.")
         st.stop()
 
-    cdf["date"] = pd.to_datetime(cdf["date"], format='mixed', dayfirst=False).dt.normalize()
-
     st.markdown('<div class="section-header">Price Statistics</div>', unsafe_allow_html=True)
     s1, s2, s3, s4 = st.columns(4)
     for col, label, val in [
@@ -706,8 +795,7 @@ elif page == "🪙 Top 3 Crypto Analysis":
         fill="tozeroy", fillcolor="rgba(247,147,26,0.07)",
     ))
     fig3.update_layout(
-        template="plotly_dark", paper_bgcolor="#12151f", plot_bgcolor="#0d0f14",
-        hovermode="x unified", margin=dict(l=10, r=10, t=10, b=10),
+        **CHART_LAYOUT, template="plotly_dark",
         yaxis_title="Price (USD)", xaxis_title="Date",
     )
     st.plotly_chart(fig3, use_container_width=True)